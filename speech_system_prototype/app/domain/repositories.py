@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import threading
 from dataclasses import asdict
-from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from .models import ChatMessage, Device, Operation, Settings, SpecialCommandSequence
 
 
+def chat_to_dict(m: ChatMessage) -> dict:
+    return {"role": m.role, "text": m.text, "ts": m.ts.isoformat()}
+
+
+def operation_to_dict(o: Operation) -> dict:
+    return {"id": o.id, "name": o.name, "status": o.status, "details": o.details, "ts": o.ts.isoformat()}
+
+
 class InMemoryStore:
     """
     Simple in-memory storage. This is intentionally a stub to match the project "design"
@@ -19,13 +29,126 @@ class InMemoryStore:
         self.operations: List[Operation] = []
         self.service_words: List[str] = ["Система", "Алиса"]
         self.sequences: Dict[str, SpecialCommandSequence] = {}
+        # Incremented once per committed device change; DeviceManager calls bump_version
+        self.version: int = 0
+        # Guards devices and version; DeviceManager instances over self.devices share it
+        self.device_lock = threading.RLock()
+        self._history_lock = threading.Lock()
+
+    def bump_version(self) -> int:
+        with self.device_lock:
+            self.version += 1
+            return self.version
+
+    def add_chat(self, message: ChatMessage) -> ChatMessage:
+        with self._history_lock:
+            message.ts = self._next_ts(self.chat)
+            self.chat.append(message)
+        return message
+
+    def add_operation(self, operation: Operation) -> Operation:
+        with self._history_lock:
+            operation.ts = self._next_ts(self.operations)
+            self.operations.append(operation)
+        return operation
+
+    @staticmethod
+    def _next_ts(items: Sequence[Any]) -> datetime:
+        # Stamped at append time and never earlier than the previous entry, even if the
+        # wall clock steps back, so history stays sorted by ts for bisect
+        ts = datetime.utcnow()
+        if items and items[-1].ts > ts:
+            ts = items[-1].ts
+        return ts
 
     def dump_state(self) -> dict:
+        with self.device_lock:
+            version = self.version
+            devices = [asdict(d) for d in self.devices.values()]
         return {
+            "version": version,
             "settings": asdict(self.settings),
-            "devices": [asdict(d) for d in self.devices.values()],
+            "devices": devices,
             "service_words": list(self.service_words),
             "sequences": {k: asdict(v) for k, v in self.sequences.items()},
-            "chat": [{"role": m.role, "text": m.text, "ts": m.ts.isoformat()} for m in self.chat[-200:]],
-            "operations": [{"id": o.id, "name": o.name, "status": o.status, "details": o.details, "ts": o.ts.isoformat()} for o in self.operations[-200:]],
+            "chat": [chat_to_dict(m) for m in self.chat[-200:]],
+            "operations": [operation_to_dict(o) for o in self.operations[-200:]],
         }
+
+    # History is append-only and, via add_chat/add_operation, ordered by ts, so a list
+    # position is a stable cursor and a time range maps to a slice found by binary search.
+
+    def iter_chat(
+        self,
+        *,
+        after: Optional[int] = None,
+        before: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        role: Optional[str] = None,
+        reverse: bool = False,
+    ) -> Iterator[Tuple[int, ChatMessage]]:
+        for i in _positions(self.chat, after, before, since, until, reverse):
+            m = self.chat[i]
+            if role and m.role != role:
+                continue
+            yield i, m
+
+    def iter_operations(
+        self,
+        *,
+        after: Optional[int] = None,
+        before: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        status: Optional[str] = None,
+        name: Optional[str] = None,
+        reverse: bool = False,
+    ) -> Iterator[Tuple[int, Operation]]:
+        for i in _positions(self.operations, after, before, since, until, reverse):
+            o = self.operations[i]
+            if status and o.status != status:
+                continue
+            if name and o.name != name:
+                continue
+            yield i, o
+
+
+def _positions(
+    items: Sequence[Any],
+    after: Optional[int],
+    before: Optional[int],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    reverse: bool,
+) -> range:
+    lo, hi = 0, len(items)
+    if after is not None:
+        lo = max(lo, after + 1)
+    if before is not None:
+        hi = min(hi, before)
+    if since is not None:
+        lo = max(lo, _bisect_ts(items, _naive_utc(since), right=False))
+    if until is not None:
+        hi = min(hi, _bisect_ts(items, _naive_utc(until), right=True))
+    if lo >= hi:
+        return range(0)
+    return range(hi - 1, lo - 1, -1) if reverse else range(lo, hi)
+
+
+def _bisect_ts(items: Sequence[Any], ts: datetime, right: bool) -> int:
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if items[mid].ts < ts or (right and items[mid].ts == ts):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _naive_utc(ts: datetime) -> datetime:
+    # Stored timestamps are naive UTC (datetime.utcnow)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
@@ -3,7 +3,9 @@ from __future__ import annotations
 from pathlib import Path
 
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
@@ -42,6 +44,17 @@ def create_app() -> FastAPI:
     # API
     app.include_router(build_router(store, pipeline))
 
+    @app.exception_handler(RequestValidationError)
+    async def validation_error(request: Request, exc: RequestValidationError):
+        # Don't echo the rejected input: NaN/inf can't be serialized by JSONResponse
+        errors = []
+        for e in exc.errors():
+            e = {k: v for k, v in e.items() if k != "input"}
+            if "ctx" in e:
+                e["ctx"] = {k: str(v) for k, v in e["ctx"].items()}
+            errors.append(e)
+        return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
     # UI
     app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
     templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
@@ -1,24 +1,31 @@
 from __future__ import annotations
 
+import json
 from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Callable, Iterator, Literal, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, Query, Request, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
-from app.domain.models import ChatMessage, Device, DeviceType, SpecialCommandSequence
-from app.domain.repositories import InMemoryStore
+from app.domain.models import ChatMessage, Device, DeviceType, Operation, SpecialCommandSequence
+from app.domain.repositories import InMemoryStore, chat_to_dict, operation_to_dict
 from app.services.asr_vosk import VoskTranscriber
 from app.routers.schemas import (
     ChatSendRequest,
     ChatSendResponse,
     DeviceAddRequest,
+    DeviceBulkRequest,
     DeviceToggleRequest,
     DeviceValueRequest,
     SequenceAddRequest,
     ServiceWordAddRequest,
     SettingsUpdateRequest,
 )
-from app.services.devices import DeviceManager
+from app.services.devices import DeviceCommand, DeviceManager, DevicesNotFound
 from app.services.pipeline import Pipeline
+from app.services.wake_word import WakeWordGate
 from app.services.utils import clamp, new_id, normalize
 
 
@@ -27,7 +34,7 @@ def build_router(store: InMemoryStore, pipeline: Pipeline) -> APIRouter:
 
     transcriber = VoskTranscriber()
 
-    devices = DeviceManager(store.devices)
+    devices = DeviceManager(store.devices, on_change=store.bump_version, lock=store.device_lock)
 
     @router.get("/state")
     def state():
@@ -36,10 +43,61 @@ def build_router(store: InMemoryStore, pipeline: Pipeline) -> APIRouter:
     @router.get("/history")
     def history():
         return {
-            "chat": [{"role": m.role, "text": m.text, "ts": m.ts.isoformat()} for m in store.chat[-200:]],
-            "operations": [{"id": o.id, "name": o.name, "status": o.status, "details": o.details, "ts": o.ts.isoformat()} for o in store.operations[-200:]],
+            "chat": [chat_to_dict(m) for m in store.chat[-200:]],
+            "operations": [operation_to_dict(o) for o in store.operations[-200:]],
         }
 
+    @router.get("/history/chat")
+    def history_chat(
+        request: Request,
+        before: Optional[int] = Query(None, ge=0, description="Cursor from next_cursor of the previous page"),
+        limit: int = Query(100, ge=1, le=1000),
+        role: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ):
+        """Chat messages, newest first."""
+        _check_filters(request, _PAGE_PARAMS | _CHAT_FILTERS)
+        rows = store.iter_chat(before=before, since=since, until=until, role=role, reverse=True)
+        return _page(rows, limit, chat_to_dict)
+
+    @router.get("/history/operations")
+    def history_operations(
+        request: Request,
+        before: Optional[int] = Query(None, ge=0, description="Cursor from next_cursor of the previous page"),
+        limit: int = Query(100, ge=1, le=1000),
+        status: Optional[str] = None,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ):
+        """Operations, newest first."""
+        _check_filters(request, _PAGE_PARAMS | _OPERATION_FILTERS)
+        rows = store.iter_operations(before=before, since=since, until=until, status=status, name=name, reverse=True)
+        return _page(rows, limit, operation_to_dict)
+
+    @router.get("/history/export")
+    def history_export(
+        request: Request,
+        kind: Literal["chat", "operations"] = "operations",
+        after: Optional[int] = Query(None, ge=0, description="Resume after this position"),
+        role: Optional[str] = None,
+        status: Optional[str] = None,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ):
+        """Stream matching records oldest first as NDJSON, one record per line."""
+        _check_filters(request, _EXPORT_PARAMS | (_CHAT_FILTERS if kind == "chat" else _OPERATION_FILTERS))
+        if kind == "chat":
+            rows = ({"cursor": i, **chat_to_dict(m)} for i, m in store.iter_chat(after=after, since=since, until=until, role=role))
+        else:
+            rows = (
+                {"cursor": i, **operation_to_dict(o)}
+                for i, o in store.iter_operations(after=after, since=since, until=until, status=status, name=name)
+            )
+        return StreamingResponse(_ndjson_batches(rows), media_type="application/x-ndjson")
+
     @router.post("/chat/send", response_model=ChatSendResponse)
     def chat_send(req: ChatSendRequest):
         result = pipeline.handle_user_text(req.text)
@@ -61,7 +119,8 @@ def build_router(store: InMemoryStore, pipeline: Pipeline) -> APIRouter:
 
     @router.get("/devices")
     def list_devices():
-        return [asdict(d) for d in devices.list_devices()]
+        with devices.lock:
+            return [asdict(d) for d in devices.list_devices()]
 
     @router.post("/devices")
     def add_device(req: DeviceAddRequest):
@@ -72,7 +131,7 @@ def build_router(store: InMemoryStore, pipeline: Pipeline) -> APIRouter:
 
         d = Device(id=new_id("dev"), name=req.name, type=dt, is_on=req.is_on, value=req.value)
         devices.add_device(d)
-        store.chat.append(ChatMessage(role="system", text=f"Устройство «{d.name}» добавлено."))
+        store.add_chat(ChatMessage(role="system", text=f"Устройство «{d.name}» добавлено."))
         return asdict(d)
 
     @router.delete("/devices/{device_id}")
@@ -96,6 +155,33 @@ def build_router(store: InMemoryStore, pipeline: Pipeline) -> APIRouter:
             raise HTTPException(status_code=404, detail="Device not found")
         return asdict(d)
 
+    @router.post("/devices/bulk")
+    def bulk_devices(req: DeviceBulkRequest):
+        """Apply many toggle/value changes at once; nothing is applied if any device is unknown."""
+        commands = [DeviceCommand(device_id=i.device_id, is_on=i.is_on, value=i.value) for i in req.items]
+
+        try:
+            with devices.lock:
+                updated, version = devices.apply_batch(commands)
+                results = [{"device_id": d.id, "ok": True, "device": asdict(d)} for d in updated]
+        except DevicesNotFound as e:
+            missing = set(e.device_ids)
+            results = [
+                {"device_id": c.device_id, "ok": c.device_id not in missing, "error": "Device not found" if c.device_id in missing else None}
+                for c in commands
+            ]
+            raise HTTPException(status_code=404, detail={"message": "Device not found", "results": results})
+
+        store.add_operation(
+            Operation(
+                id=new_id("op"),
+                name="Пакетное управление устройствами",
+                status="done",
+                details={"count": len(commands), "devices": sorted({c.device_id for c in commands}), "version": version},
+            )
+        )
+        return {"ok": True, "version": version, "results": results}
+
     @router.post("/special/service-word")
     def add_service_word(req: ServiceWordAddRequest):
         word = normalize(req.word)
@@ -131,4 +217,82 @@ def build_router(store: InMemoryStore, pipeline: Pipeline) -> APIRouter:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"ASR error: {e}")
 
+    @router.websocket("/asr/stream")
+    async def asr_stream(ws: WebSocket):
+        """Always-listening stream of mono 16kHz PCM16 chunks, gated by service words."""
+        await ws.accept()
+        try:
+            model = await run_in_threadpool(transcriber.get_model)
+            gate = WakeWordGate(model, store.service_words, transcriber.sample_rate)
+        except RuntimeError as e:
+            await ws.send_json({"ok": False, "error": str(e)})
+            await ws.close()
+            return
+        except Exception as e:
+            # vosk.Model raises a plain Exception for a broken model directory
+            await ws.send_json({"ok": False, "error": f"ASR error: {e}"})
+            await ws.close()
+            return
+
+        try:
+            while True:
+                try:
+                    chunk = await ws.receive_bytes()
+                except KeyError:
+                    # Text frame instead of binary audio
+                    await ws.send_json({"ok": False, "error": "Expected binary PCM16 audio frames"})
+                    await ws.close(code=1003)
+                    return
+                if not gate.active:
+                    # Service words may be edited while the stream is open
+                    gate.set_service_words(store.service_words)
+                for ev in await run_in_threadpool(gate.accept, chunk):
+                    msg = {"ok": True, "event": ev.kind, "text": ev.text, "word": ev.word}
+                    if ev.kind == "utterance":
+                        result = await run_in_threadpool(pipeline.handle_user_text, ev.text)
+                        msg.update(messages=result.get("messages", []), action=result.get("action", {}), intent=result.get("intent"))
+                    await ws.send_json(msg)
+        except WebSocketDisconnect:
+            pass
+
     return router
+
+
+_PAGE_PARAMS = {"before", "limit"}
+_EXPORT_PARAMS = {"kind", "after"}
+_CHAT_FILTERS = {"role", "since", "until"}
+_OPERATION_FILTERS = {"status", "name", "since", "until"}
+
+# Records per streamed chunk: Starlette iterates sync generators in the threadpool,
+# one round-trip per yielded item
+_EXPORT_BATCH = 1000
+
+
+def _check_filters(request: Request, allowed: set) -> None:
+    # A typo'd or mismatched filter must not silently return unfiltered history
+    unknown = sorted(set(request.query_params) - allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported filters: {', '.join(unknown)}")
+
+
+def _ndjson_batches(rows: Iterator[dict]) -> Iterator[str]:
+    batch = []
+    for r in rows:
+        batch.append(json.dumps(r, ensure_ascii=False, default=str))
+        if len(batch) == _EXPORT_BATCH:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def _page(rows: Iterator[Tuple[int, Any]], limit: int, to_dict: Callable[[Any], dict]) -> dict:
+    items = []
+    last: Optional[int] = None
+    for i, x in rows:
+        if len(items) == limit:
+            # More rows exist: the next page continues before the last returned one
+            return {"items": items, "next_cursor": last}
+        items.append(to_dict(x))
+        last = i
+    return {"items": items, "next_cursor": None}
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class ChatSendRequest(BaseModel):
@@ -31,7 +31,7 @@ class DeviceAddRequest(BaseModel):
     name: str
     type: str
     is_on: bool = False
-    value: Optional[float] = None
+    value: Optional[float] = Field(None, allow_inf_nan=False)
 
 
 class DeviceToggleRequest(BaseModel):
@@ -39,7 +39,23 @@ class DeviceToggleRequest(BaseModel):
 
 
 class DeviceValueRequest(BaseModel):
-    value: float
+    value: float = Field(..., allow_inf_nan=False)
+
+
+class DeviceBulkItem(BaseModel):
+    device_id: str
+    is_on: Optional[bool] = None
+    value: Optional[float] = Field(None, allow_inf_nan=False)
+
+    @model_validator(mode="after")
+    def _has_change(self) -> "DeviceBulkItem":
+        if self.is_on is None and self.value is None:
+            raise ValueError("Either is_on or value must be set")
+        return self
+
+
+class DeviceBulkRequest(BaseModel):
+    items: List[DeviceBulkItem] = Field(..., min_length=1, max_length=1000)
 
 
 class ServiceWordAddRequest(BaseModel):
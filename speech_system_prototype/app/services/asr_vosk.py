@@ -29,6 +29,9 @@ class VoskTranscriber:
         self.sample_rate = sample_rate
         self._model: Optional[Model] = None
 
+    def get_model(self) -> Model:
+        return self._load_model()
+
     def _load_model(self) -> Model:
         if self._model is not None:
             return self._model
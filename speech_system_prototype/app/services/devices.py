@@ -1,14 +1,43 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 from app.domain.models import Device, DeviceType
 from app.services.utils import clamp
 
+# For demo: temperature-like devices are clamped to this range
+_CLAMPED_TYPES = (DeviceType.AC, DeviceType.THERMOSTAT)
+_VALUE_MIN = 10.0
+_VALUE_MAX = 30.0
+
+
+@dataclass
+class DeviceCommand:
+    device_id: str
+    is_on: Optional[bool] = None
+    value: Optional[float] = None
+
+
+class DevicesNotFound(KeyError):
+    def __init__(self, device_ids: List[str]) -> None:
+        super().__init__(f"Device not found: {', '.join(device_ids)}")
+        self.device_ids = device_ids
+
 
 class DeviceManager:
-    def __init__(self, devices: Dict[str, Device]) -> None:
+    def __init__(
+        self,
+        devices: Dict[str, Device],
+        on_change: Optional[Callable[[], int]] = None,
+        lock: Optional[threading.RLock] = None,
+    ) -> None:
         self.devices = devices
+        # Called once per committed change, e.g. InMemoryStore.bump_version
+        self.on_change = on_change
+        # Shared by every manager over the same dict, e.g. InMemoryStore.device_lock
+        self.lock = lock or threading.RLock()
 
     def list_devices(self) -> list[Device]:
         return list(self.devices.values())
@@ -17,26 +46,61 @@ class DeviceManager:
         return self.devices.get(device_id)
 
     def toggle(self, device_id: str, is_on: bool) -> Device:
-        d = self._must(device_id)
-        d.is_on = bool(is_on)
+        with self.lock:
+            d = self._must(device_id)
+            d.is_on = bool(is_on)
+            self._changed()
         return d
 
     def set_value(self, device_id: str, value: float) -> Device:
-        d = self._must(device_id)
-        # For demo: clamp temperature-like values
-        if d.type in (DeviceType.AC, DeviceType.THERMOSTAT):
-            d.value = clamp(float(value), 10.0, 30.0)
-        else:
-            d.value = float(value)
+        with self.lock:
+            d = self._must(device_id)
+            d.value = self._clamped(d, value)
+            self._changed()
         return d
 
+    def apply_batch(self, commands: Sequence[DeviceCommand]) -> Tuple[List[Device], Optional[int]]:
+        """
+        Apply toggle/value changes all-or-nothing under the device lock: every device is
+        resolved before the first one is mutated, and the batch counts as one change.
+        Returns devices in command order and the version reported by on_change.
+        """
+        with self.lock:
+            missing = [c.device_id for c in commands if c.device_id not in self.devices]
+            if missing:
+                raise DevicesNotFound(missing)
+
+            targets = [self.devices[c.device_id] for c in commands]
+            for c, d in zip(commands, targets):
+                if c.is_on is not None:
+                    d.is_on = bool(c.is_on)
+                if c.value is not None:
+                    d.value = self._clamped(d, c.value)
+            version = self._changed() if commands else None
+        return targets, version
+
     def add_device(self, device: Device) -> Device:
-        self.devices[device.id] = device
+        with self.lock:
+            self.devices[device.id] = device
+            self._changed()
         return device
 
     def remove_device(self, device_id: str) -> None:
-        if device_id in self.devices:
-            del self.devices[device_id]
+        with self.lock:
+            if device_id in self.devices:
+                del self.devices[device_id]
+                self._changed()
+
+    def _clamped(self, d: Device, value: float) -> float:
+        # For demo: clamp temperature-like values
+        if d.type in _CLAMPED_TYPES:
+            return clamp(float(value), _VALUE_MIN, _VALUE_MAX)
+        return float(value)
+
+    def _changed(self) -> Optional[int]:
+        if self.on_change is not None:
+            return self.on_change()
+        return None
 
     def _must(self, device_id: str) -> Device:
         d = self.devices.get(device_id)
@@ -18,7 +18,7 @@ class Pipeline:
     def __init__(self, store: InMemoryStore) -> None:
         self.store = store
         self.nlu = RuleNLU()
-        self.devices = DeviceManager(store.devices)
+        self.devices = DeviceManager(store.devices, on_change=store.bump_version, lock=store.device_lock)
         self.active_operation_id: Optional[str] = None
 
     def handle_user_text(self, text: str) -> Dict[str, Any]:
@@ -83,7 +83,7 @@ class Pipeline:
         self._op("Принятие решений", "done", {"sequence": name, "steps": steps})
         op_id = new_id("op")
         self.active_operation_id = op_id
-        self.store.operations.append(Operation(id=op_id, name=f"Выполнение последовательности: {name}", status="running", details={"steps": steps}))
+        self.store.add_operation(Operation(id=op_id, name=f"Выполнение последовательности: {name}", status="running", details={"steps": steps}))
 
         for step in steps:
             # Re-run step via NLU to reuse logic
@@ -118,7 +118,7 @@ class Pipeline:
                 self._op("Принятие решений", "done", {"device_id": d.id, "action": "set_temperature", "value": intent.value})
                 op_id = new_id("op")
                 self.active_operation_id = op_id
-                self.store.operations.append(Operation(id=op_id, name="Изменение температуры", status="running", details={"device": d.name, "value": intent.value}))
+                self.store.add_operation(Operation(id=op_id, name="Изменение температуры", status="running", details={"device": d.name, "value": intent.value}))
 
                 self.devices.toggle(d.id, True)
                 self.devices.set_value(d.id, float(intent.value or 22))
@@ -165,7 +165,7 @@ class Pipeline:
         return {"messages": messages, "action": action, "intent": intent.name}
 
     def _add_chat(self, role: str, text: str) -> None:
-        self.store.chat.append(ChatMessage(role=role, text=text))
+        self.store.add_chat(ChatMessage(role=role, text=text))
 
     def _op(self, name: str, status: str, details: Dict[str, Any]) -> None:
-        self.store.operations.append(Operation(id=new_id("op"), name=name, status=status, details=details))
+        self.store.add_operation(Operation(id=new_id("op"), name=name, status=status, details=details))
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+import math
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from vosk import KaldiRecognizer, Model
+
+from app.services.utils import normalize
+
+
+@dataclass
+class GateEvent:
+    kind: str  # "wake" | "utterance" | "timeout"
+    text: str = ""
+    word: Optional[str] = None
+
+
+def chunk_rms(chunk: bytes) -> float:
+    """RMS level of a PCM16 little-endian chunk."""
+    samples = array("h")
+    samples.frombytes(chunk[: len(chunk) - len(chunk) % 2])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class WakeWordGate:
+    """Service-word gating for a continuous PCM16 mono audio stream.
+
+    Notes:
+    - Silent chunks (RMS below energy_threshold) are not decoded at all, apart from a short
+      hangover after speech so the keyword recognizer can finish its utterance.
+    - Other idle audio goes only to a grammar-restricted recognizer that knows just the
+      service words (plus "[unk]"), which is cheaper than open-vocabulary decoding.
+    - The gate wakes only on a final keyword result (partials are unstable and cause false
+      wakes). Buffered audio from the start of the service word is replayed into the full
+      recognizer, so it hears the whole service word but nothing said before it.
+    - Full decoding runs until Vosk reports end of utterance; the text after the service
+      word is returned as an "utterance" event and the gate goes idle.
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        service_words: Sequence[str],
+        sample_rate: int = 16000,
+        max_utterance_sec: float = 10.0,
+        energy_threshold: float = 300.0,
+        hangover_sec: float = 1.0,
+    ) -> None:
+        self.model = model
+        self.sample_rate = sample_rate
+        # PCM16 mono: 2 bytes per sample
+        self.max_utterance_bytes = int(max_utterance_sec * sample_rate * 2)
+        self.energy_threshold = energy_threshold
+        self.hangover_bytes = int(hangover_sec * sample_rate * 2)
+
+        self._words: Tuple[str, ...] = ()
+        self._kws: Optional[KaldiRecognizer] = None
+        self._full: Optional[KaldiRecognizer] = None
+        self._active_bytes = 0
+        self._wake_word: Optional[str] = None
+        # Positions below are byte offsets in the audio fed to the current keyword recognizer
+        self._kws_bytes = 0
+        self._silent_bytes = 0
+        self._preroll: Deque[bytes] = deque()
+        self._preroll_start = 0
+        self._preroll_bytes = 0
+        self.set_service_words(service_words)
+
+    @property
+    def active(self) -> bool:
+        return self._full is not None
+
+    def set_service_words(self, service_words: Sequence[str]) -> None:
+        words = tuple(w for w in (normalize(x).lower() for x in service_words) if w)
+        if words == self._words and self._kws is not None:
+            return
+        self._words = words
+        grammar = json.dumps(list(words) + ["[unk]"], ensure_ascii=False)
+        self._kws = KaldiRecognizer(self.model, self.sample_rate, grammar)
+        self._kws.SetWords(True)
+        self._kws_bytes = 0
+        self._silent_bytes = self.hangover_bytes
+        self._clear_preroll()
+
+    def accept(self, chunk: bytes) -> List[GateEvent]:
+        if not chunk:
+            return []
+        if self._full is None:
+            return self._accept_idle(chunk)
+        return self._accept_active(chunk, live=True)
+
+    def _accept_idle(self, chunk: bytes) -> List[GateEvent]:
+        if self.energy_threshold > 0 and chunk_rms(chunk) < self.energy_threshold:
+            if self._silent_bytes >= self.hangover_bytes:
+                return []
+            self._silent_bytes += len(chunk)
+        else:
+            self._silent_bytes = 0
+
+        if self._feed_kws(chunk):
+            result = self._kws.Result()
+        elif self._silent_bytes >= self.hangover_bytes:
+            # Long enough silence: close the keyword utterance, decoding stops after this
+            result = self._kws.FinalResult()
+        else:
+            return []
+        return self._on_kws_result(json.loads(result or "{}"))
+
+    def _feed_kws(self, chunk: bytes) -> bool:
+        self._preroll.append(chunk)
+        self._preroll_bytes += len(chunk)
+        while self._preroll_bytes > self.max_utterance_bytes and len(self._preroll) > 1:
+            dropped = len(self._preroll.popleft())
+            self._preroll_bytes -= dropped
+            self._preroll_start += dropped
+        self._kws_bytes += len(chunk)
+        return self._kws.AcceptWaveform(chunk)
+
+    def _on_kws_result(self, result: Dict[str, Any]) -> List[GateEvent]:
+        word, start = self._match(result)
+        replay = self._preroll_from(start) if word else []
+        self._clear_preroll()
+        if not word:
+            return []
+
+        self._wake_word = word
+        self._full = KaldiRecognizer(self.model, self.sample_rate)
+        self._active_bytes = 0
+        events = [GateEvent(kind="wake", word=word)]
+        for c in replay:
+            events.extend(self._accept_active(c, live=False))
+            if self._full is None:
+                break
+        return events
+
+    def _accept_active(self, chunk: bytes, live: bool) -> List[GateEvent]:
+        # Replayed pre-roll doesn't count against the utterance budget
+        if live:
+            self._active_bytes += len(chunk)
+        if self._full.AcceptWaveform(chunk):
+            text = self._after_wake_word(json.loads(self._full.Result() or "{}").get("text", ""))
+            if text:
+                self._reset()
+                return [GateEvent(kind="utterance", text=text)]
+
+        if self._active_bytes >= self.max_utterance_bytes:
+            text = self._after_wake_word(json.loads(self._full.FinalResult() or "{}").get("text", ""))
+            self._reset()
+            if text:
+                return [GateEvent(kind="utterance", text=text)]
+            return [GateEvent(kind="timeout")]
+
+        return []
+
+    def _match(self, result: Dict[str, Any]) -> Tuple[Optional[str], Optional[float]]:
+        """Return the service word found in a keyword result and its start time, if known."""
+        words = [w for w in result.get("result") or [] if isinstance(w, dict)]
+        if words:
+            tokens = [str(w.get("word", "")).lower() for w in words]
+            for phrase in self._words:
+                p = phrase.split()
+                for i in range(len(tokens) - len(p) + 1):
+                    if tokens[i:i + len(p)] == p:
+                        return phrase, float(words[i].get("start", 0.0))
+            return None, None
+
+        text = f" {(result.get('text') or '').strip().lower()} "
+        for phrase in self._words:
+            if f" {phrase} " in text:
+                return phrase, None
+        return None, None
+
+    def _preroll_from(self, start: Optional[float]) -> List[bytes]:
+        if start is None:
+            return list(self._preroll)
+        # Keyword start in the keyword stream, aligned to a whole sample
+        offset = int(start * self.sample_rate) * 2
+        out = []
+        pos = self._preroll_start
+        for c in self._preroll:
+            end = pos + len(c)
+            if end > offset:
+                out.append(c[max(0, offset - pos):])
+            pos = end
+        return out
+
+    def _after_wake_word(self, text: str) -> str:
+        # Replay starts at the service word, so drop it (and any fragment before it)
+        tokens = normalize(text).split()
+        if self._wake_word is not None:
+            wake = self._wake_word.split()
+            n = len(wake)
+            for i in range(len(tokens) - n + 1):
+                if [t.lower() for t in tokens[i:i + n]] == wake:
+                    return " ".join(tokens[i + n:])
+        return " ".join(tokens)
+
+    def _clear_preroll(self) -> None:
+        self._preroll.clear()
+        self._preroll_start = self._kws_bytes
+        self._preroll_bytes = 0
+
+    def _reset(self) -> None:
+        self._full = None
+        self._active_bytes = 0
+        self._wake_word = None
@@ -0,0 +1,91 @@
+"""Idle CPU per microphone stream: full Vosk decoding vs service-word gating.
+
+Rows: full open-vocabulary decoding, the keyword recognizer alone (energy check off),
+and the gate as deployed (energy check skips silent chunks).
+
+Run from the project root:
+    python -m benchmarks.idle_cpu --model models/vosk-model-small-ru-0.22 --seconds 60
+
+Without --wav the idle audio is synthetic low-level noise (room tone, no speech),
+which stays below the default energy threshold; use --wav with a real idle recording
+to see how often the keyword recognizer still runs.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import struct
+import time
+import wave
+from typing import Callable, List
+
+from vosk import KaldiRecognizer, Model, SetLogLevel
+
+from app.services.wake_word import WakeWordGate
+
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 4000  # 0.25 s, same block size as VoskTranscriber
+
+
+def synthetic_idle(seconds: float, amplitude: int = 200, seed: int = 0) -> List[bytes]:
+    rnd = random.Random(seed)
+    n_chunks = int(seconds * SAMPLE_RATE / CHUNK_SAMPLES)
+    fmt = f"<{CHUNK_SAMPLES}h"
+    return [struct.pack(fmt, *(rnd.randint(-amplitude, amplitude) for _ in range(CHUNK_SAMPLES))) for _ in range(n_chunks)]
+
+
+def wav_idle(path: str) -> List[bytes]:
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getframerate() != SAMPLE_RATE or wf.getsampwidth() != 2:
+            raise ValueError("Need mono 16kHz PCM16 WAV")
+        chunks = []
+        while True:
+            data = wf.readframes(CHUNK_SAMPLES)
+            if not data:
+                break
+            chunks.append(data)
+    return chunks
+
+
+def cpu_per_stream(feed: Callable[[bytes], object], chunks: List[bytes]) -> float:
+    """Return CPU seconds spent per second of audio (i.e. fraction of one core)."""
+    start = time.process_time()
+    for c in chunks:
+        feed(c)
+    spent = time.process_time() - start
+    audio_sec = sum(len(c) for c in chunks) / (2 * SAMPLE_RATE)
+    return spent / audio_sec
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--model", required=True, help="Path to Vosk model directory")
+    ap.add_argument("--seconds", type=float, default=60.0, help="Length of synthetic idle audio")
+    ap.add_argument("--wav", help="Use idle audio from a mono 16kHz PCM16 WAV instead of synthetic noise")
+    ap.add_argument("--words", nargs="+", default=["Система", "Алиса"], help="Service words")
+    ap.add_argument("--energy", type=float, default=300.0, help="Gate energy threshold (RMS, PCM16 units)")
+    args = ap.parse_args()
+
+    SetLogLevel(-1)
+    model = Model(args.model)
+    chunks = wav_idle(args.wav) if args.wav else synthetic_idle(args.seconds)
+
+    full = KaldiRecognizer(model, SAMPLE_RATE)
+    kws_only = WakeWordGate(model, args.words, SAMPLE_RATE, energy_threshold=0)
+    gate = WakeWordGate(model, args.words, SAMPLE_RATE, energy_threshold=args.energy)
+
+    rows = [
+        ("full decoding", cpu_per_stream(full.AcceptWaveform, chunks)),
+        ("keyword recognizer", cpu_per_stream(kws_only.accept, chunks)),
+        ("gate + energy check", cpu_per_stream(gate.accept, chunks)),
+    ]
+
+    full_cpu = rows[0][1]
+    print(f"audio: {len(chunks) * CHUNK_SAMPLES / SAMPLE_RATE:.1f} s idle")
+    for name, cpu in rows:
+        ratio = f"{full_cpu / cpu:8.1f}x" if cpu > 0 else "       -"
+        print(f"{name:20s}: {cpu * 100:6.2f} % of one core per stream  {ratio}")
+
+
+if __name__ == "__main__":
+    main()